@@ -1,31 +1,63 @@
 import json
 import math
-from collections import defaultdict
+import os
+from collections import defaultdict, deque
+from functools import lru_cache
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
+from matplotlib.font_manager import FontProperties
 import argparse
+import numpy as np
 import pandas as pd
 
+try:
+    import orjson
+except ImportError:
+    # orjson is optional: without it JSON output goes through the standard library
+    orjson = None
+
 
 def save_to_file(data, filename):
     """Helper function to save data to a file."""
+    if filename.endswith('.json') and orjson is not None:
+        with open(filename, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        return
+
     with open(filename, 'w') as f:
         if filename.endswith('.json'):
             json.dump(data, f, indent=2)
         else:
             f.write(data)
 
-def save_visualization(fig, filename):
-    """Helper function to save a visualization to a file."""
+def save_visualization(fig, filename, close=True):
+    """Helper function to save a visualization to a file; pass close=False to keep reusing the figure."""
     print(fig)  # Should print something like <Figure size 1400x800 with 1 Axes>
-    fig.savefig(filename, bbox_inches='tight')
-    plt.close(fig)
+    fig.savefig(filename, bbox_inches='tight', dpi=100)
+    if close:
+        plt.close(fig)
+
+
+@lru_cache(maxsize=4)
+def _read_process_list(json_file_path, mtime):
+    """Read a process list file; cached per absolute path and modification time."""
+    if orjson is not None:
+        with open(json_file_path, 'rb') as f:
+            records = orjson.loads(f.read())
+    else:
+        with open(json_file_path) as f:
+            records = json.load(f)
+    return pd.DataFrame.from_records(records)
 
 
 def load_data(json_file_path):
     """Load JSON data into a Pandas DataFrame."""
     try:
-        df = pd.read_json(json_file_path)
+        # Hand out a copy so callers can't modify the cached DataFrame; copy() shares the
+        # dependency lists with it, so those are copied as well
+        df = _read_process_list(os.path.abspath(json_file_path), os.path.getmtime(json_file_path)).copy()
+        if 'dependency' in df:
+            df['dependency'] = [list(deps) for deps in df['dependency']]
         return df
     except FileNotFoundError:
         print(f"Error: File '{json_file_path}' not found.")
@@ -35,12 +67,238 @@ def load_data(json_file_path):
         return None
 
 
-def calculate_station_time(station_processes):
-    return sum(p['expectedTimeInMin'] for p in station_processes)
+def _allocate_numba(indeg, succ_flat, succ_offsets, mtype_codes, times, throughput_target):
+    """
+    Allocate processes to stations in dependency order, one machine type per station.
 
+    Args:
+        indeg (np.ndarray): Number of dependencies of each process.
+        succ_flat (np.ndarray): Successor row indices of all processes, concatenated.
+        succ_offsets (np.ndarray): Start of each process's successors in succ_flat, plus a final end offset.
+        mtype_codes (np.ndarray): Integer machine type code of each process.
+        times (np.ndarray): Expected time of each process in minutes.
+        throughput_target (float): Target throughput in minutes.
 
-def check_dependencies_met(process_id, allocated_processes, process_dependencies):
-    return all(dep in allocated_processes for dep in process_dependencies.get(process_id, []))
+    Returns:
+        tuple: Row indices in allocation order, start of each station in that order
+        (plus a final end offset), and the total expected time of each station.
+    """
+    n = len(times)
+    n_types = mtype_codes.max() + 1 if n > 0 else 0
+
+    # One ring buffer of ready processes per machine type, packed into a single array
+    capacity = np.zeros(n_types, np.int64)
+    min_time = np.full(n_types, np.inf)
+    for i in range(n):
+        capacity[mtype_codes[i]] += 1
+        min_time[mtype_codes[i]] = min(min_time[mtype_codes[i]], times[i])
+    buf_offsets = np.zeros(n_types + 1, np.int64)
+    buf_offsets[1:] = np.cumsum(capacity)
+    buf = np.empty(n, np.int64)
+    head = np.zeros(n_types, np.int64)
+    size = np.zeros(n_types, np.int64)
+
+    # Every process enters the global ready queue once, in the order it becomes ready
+    ready = np.empty(n, np.int64)
+    ready_head = 0
+    ready_tail = 0
+    allocated = np.zeros(n, np.bool_)
+
+    remaining = indeg.copy()
+    for i in range(n):
+        if remaining[i] == 0:
+            c = mtype_codes[i]
+            buf[buf_offsets[c] + (head[c] + size[c]) % capacity[c]] = i
+            size[c] += 1
+            ready[ready_tail] = i
+            ready_tail += 1
+
+    order = np.empty(n, np.int64)
+    station_offsets = np.zeros(n + 1, np.int64)
+    station_totals = np.empty(n, np.float64)
+    skipped = np.empty(n, np.int64)
+    n_allocated = 0
+    n_stations = 0
+
+    while True:
+        # Seed the next station with the earliest ready process not allocated yet
+        while ready_head < ready_tail and allocated[ready[ready_head]]:
+            ready_head += 1
+        if ready_head == ready_tail:
+            break
+        i = ready[ready_head]
+        ready_head += 1
+        c = mtype_codes[i]
+
+        # Fill the station with ready processes of the same machine type, starting from the seed
+        start = n_allocated
+        total = 0.0
+        n_skipped = 0
+        while i >= 0:
+            if n_allocated > start and total + times[i] > throughput_target:
+                skipped[n_skipped] = i
+                n_skipped += 1
+            else:
+                order[n_allocated] = i
+                n_allocated += 1
+                total += times[i]
+                allocated[i] = True
+
+                # Release the successors whose last dependency was just allocated
+                for k in range(succ_offsets[i], succ_offsets[i + 1]):
+                    j = succ_flat[k]
+                    remaining[j] -= 1
+                    if remaining[j] == 0:
+                        t = mtype_codes[j]
+                        buf[buf_offsets[t] + (head[t] + size[t]) % capacity[t]] = j
+                        size[t] += 1
+                        ready[ready_tail] = j
+                        ready_tail += 1
+
+            # Take the next unallocated process of this machine type, unless nothing else can fit
+            i = -1
+            while i < 0 and size[c] > 0 and total + min_time[c] <= throughput_target:
+                i = buf[buf_offsets[c] + head[c]]
+                head[c] = (head[c] + 1) % capacity[c]
+                size[c] -= 1
+                if allocated[i]:
+                    i = -1
+
+        # Put skipped processes back at the front of the queue, keeping their order
+        for k in range(n_skipped - 1, -1, -1):
+            head[c] = (head[c] - 1) % capacity[c]
+            buf[buf_offsets[c] + head[c]] = skipped[k]
+            size[c] += 1
+
+        station_totals[n_stations] = total
+        n_stations += 1
+        station_offsets[n_stations] = n_allocated
+
+    return order[:n_allocated], station_offsets[:n_stations + 1], station_totals[:n_stations]
+
+
+def _allocate_python(indeg, succ_flat, succ_offsets, mtype_codes, times, throughput_target):
+    """
+    List/deque version of _allocate_numba, used when numba is not installed.
+
+    Takes the same arguments and returns the same allocation; plain Python lists and deques
+    are much faster than element-wise NumPy indexing when the kernel can't be compiled.
+    """
+    remaining = indeg.tolist()
+    succ_flat = succ_flat.tolist()
+    succ_offsets = succ_offsets.tolist()
+    mtype_codes = mtype_codes.tolist()
+    times = times.tolist()
+
+    min_time = {}
+    for c, expected_time in zip(mtype_codes, times):
+        min_time[c] = min(min_time.get(c, expected_time), expected_time)
+
+    # Ready processes per machine type, plus every ready process in the order it became ready
+    ready_by_mt = defaultdict(deque)
+    ready = deque()
+    allocated = [False] * len(times)
+    for i, count in enumerate(remaining):
+        if count == 0:
+            ready_by_mt[mtype_codes[i]].append(i)
+            ready.append(i)
+
+    order = []
+    station_offsets = [0]
+    station_totals = []
+
+    while True:
+        # Seed the next station with the earliest ready process not allocated yet
+        while ready and allocated[ready[0]]:
+            ready.popleft()
+        if not ready:
+            break
+        i = ready.popleft()
+        c = mtype_codes[i]
+        queue = ready_by_mt[c]
+
+        # Fill the station with ready processes of the same machine type, starting from the seed
+        start = len(order)
+        total = 0.0
+        skipped = []
+        while i >= 0:
+            if len(order) > start and total + times[i] > throughput_target:
+                skipped.append(i)
+            else:
+                order.append(i)
+                total += times[i]
+                allocated[i] = True
+
+                # Release the successors whose last dependency was just allocated
+                for j in succ_flat[succ_offsets[i]:succ_offsets[i + 1]]:
+                    remaining[j] -= 1
+                    if remaining[j] == 0:
+                        ready_by_mt[mtype_codes[j]].append(j)
+                        ready.append(j)
+
+            # Take the next unallocated process of this machine type, unless nothing else can fit
+            i = -1
+            while i < 0 and queue and total + min_time[c] <= throughput_target:
+                i = queue.popleft()
+                if allocated[i]:
+                    i = -1
+
+        # Put skipped processes back at the front of the queue, keeping their order
+        queue.extendleft(reversed(skipped))
+
+        station_totals.append(total)
+        station_offsets.append(len(order))
+
+    return (np.array(order, dtype=np.int64), np.array(station_offsets, dtype=np.int64),
+            np.array(station_totals, dtype=np.float64))
+
+
+# Below this many processes, compiling the numba kernel takes longer than it saves
+NUMBA_MIN_PROCESSES = 150_000
+
+
+@lru_cache(maxsize=None)
+def _compiled_allocator():
+    """Compile _allocate_numba with numba, or return None when numba is not installed."""
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+    return njit(_allocate_numba)
+
+
+def _build_dependency_graph(ids, deps):
+    """
+    Validate dependencies and build the dependency graph.
+
+    Args:
+        ids (list): Process IDs, in row order.
+        deps (list): List of dependency IDs of each process, in row order.
+
+    Returns:
+        tuple: Dependency count of each process, and its successors as CSR
+        (succ_flat, succ_offsets) arrays.
+    """
+    # Validate dependencies
+    id_set = set(ids)
+    for process_id, process_deps in zip(ids, deps):
+        for dep in process_deps:
+            if dep not in id_set:
+                raise ValueError(f"Process '{process_id}' has invalid dependency: '{dep}'")
+
+    # Dependencies as CSR: row indices of every process's dependencies, concatenated
+    id_to_idx = {process_id: i for i, process_id in enumerate(ids)}
+    indeg = np.fromiter(map(len, deps), dtype=np.int32, count=len(deps))
+    dep_flat = np.fromiter((id_to_idx[dep] for process_deps in deps for dep in process_deps),
+                           dtype=np.int32, count=int(indeg.sum()))
+    dependents = np.repeat(np.arange(len(deps), dtype=np.int32), indeg)
+
+    # Successors are the same edges grouped by dependency, dependents kept in row order
+    succ_flat = dependents[np.argsort(dep_flat, kind='stable')]
+    succ_offsets = np.zeros(len(ids) + 1, dtype=np.int32)
+    succ_offsets[1:] = np.cumsum(np.bincount(dep_flat, minlength=len(ids)))
+
+    return indeg, succ_flat, succ_offsets
 
 
 def allocate_processes_to_stations(df, respect_dependencies=True, throughput_target=1.0):
@@ -57,78 +315,64 @@ def allocate_processes_to_stations(df, respect_dependencies=True, throughput_tar
     """
     stations = []
     station_id = 1
-    allocated_processes = set()
+
+    # Read each column once; processes are referred to by row index from here on
+    ids = df['id'].tolist()
+    names = df['name'].tolist()
+    times = df['expectedTimeInMin'].to_numpy(dtype=np.float64)
+
+    # Machine types as integer codes, numbered in sorted order of the type names; a missing
+    # machine type gets a code of its own, after the named ones
+    mtype_codes, _ = pd.factorize(df['machineType'], sort=True, use_na_sentinel=False)
+    mtype_codes = mtype_codes.astype(np.int32)
 
     if respect_dependencies:
-        # Validate dependencies
-        for process_id, deps in df.set_index('id')['dependency'].items():
-            for dep in deps:
-                if dep not in df['id'].values:
-                    raise ValueError(f"Process '{process_id}' has invalid dependency: '{dep}'")
-
-        while len(allocated_processes) < len(df):
-            found_new_station = False
-            for _, process in df.iterrows():
-                if process['id'] in allocated_processes:
-                    continue
-
-                # Check if dependencies are met
-                if all(dep in allocated_processes for dep in process['dependency']):
-                    machine_type = process['machineType']
-                    current_station = [process]
-                    allocated_processes.add(process['id'])
-
-                    # Add processes with the same machine type
-                    for _, next_process in df.iterrows():
-                        if next_process['id'] in allocated_processes:
-                            continue
-                        if (next_process['machineType'] == machine_type and
-                            all(dep in allocated_processes for dep in next_process['dependency']) and
-                            (sum(p['expectedTimeInMin'] for p in current_station)) + next_process['expectedTimeInMin'] <= throughput_target):
-                            current_station.append(next_process)
-                            allocated_processes.add(next_process['id'])
-
-                    # Add station to the list
-                    stations.append({
-                        'station_id': f"S{station_id}",
-                        'processes': [{'id': p['id'], 'name': p['name']} for p in current_station],
-                        'total_expected_time': sum(p['expectedTimeInMin'] for p in current_station),
-                        'waste_time': throughput_target - sum(p['expectedTimeInMin'] for p in current_station),
-                        'machines_required': 1
-                    })
-                    station_id += 1
-                    found_new_station = True
-                    break
-
-            if not found_new_station:
-                break
+        # Build the dependency graph once: dependency count and successors (CSR) of each process
+        indeg, succ_flat, succ_offsets = _build_dependency_graph(ids, df['dependency'].tolist())
+
+        # Use the compiled kernel only for process lists large enough to pay for compiling it
+        allocate = _allocate_python
+        if len(df) >= NUMBA_MIN_PROCESSES:
+            allocate = _compiled_allocator() or _allocate_python
+        order, station_offsets, station_totals = allocate(
+            indeg, succ_flat, succ_offsets, mtype_codes, times, throughput_target)
+
+        # List each station's processes in file order, like the grouping branch does
+        for k, total_expected_time in enumerate(station_totals.tolist()):
+            station_rows = np.sort(order[station_offsets[k]:station_offsets[k + 1]]).tolist()
+            stations.append({
+                'station_id': f"S{station_id}",
+                'processes': [{'id': ids[i], 'name': names[i]} for i in station_rows],
+                'total_expected_time': total_expected_time,
+                'waste_time': throughput_target - total_expected_time,
+                'machines_required': 1
+            })
+            station_id += 1
     else:
-        # Group processes by machine type
-        machine_type_groups = df.groupby('machineType')
-
-        for machine_type, group in machine_type_groups:
-            station_processes = []
+        # Group processes by machine type, keeping their original order within each group
+        rows_by_mt = np.argsort(mtype_codes, kind='stable')
+        group_ends = np.cumsum(np.bincount(mtype_codes)).tolist()
+        for group_start, group_end in zip([0] + group_ends[:-1], group_ends):
+            group_idx = rows_by_mt[group_start:group_end]
+            group_times = times[group_idx]
+
+            # Find where each station starts and its total: a new one opens when the next process would exceed the target
+            starts = [0]
+            totals = []
             total_expected_time = 0
-            for _, process in group.iterrows():
-                if total_expected_time + process['expectedTimeInMin'] <= throughput_target:
-                    station_processes.append(process)
-                    total_expected_time += process['expectedTimeInMin']
-                else:
-                    stations.append({
-                        'station_id': f"S{station_id}",
-                        'processes': [{'id': p['id'], 'name': p['name']} for p in station_processes],
-                        'total_expected_time': total_expected_time,
-                        'waste_time': throughput_target - total_expected_time,
-                        'machines_required': math.ceil(total_expected_time)
-                    })
-                    station_id += 1
-                    station_processes = [process]
-                    total_expected_time = process['expectedTimeInMin']
-
-            if station_processes:
+            for k, expected_time in enumerate(group_times.tolist()):
+                if k > starts[-1] and total_expected_time + expected_time > throughput_target:
+                    starts.append(k)
+                    totals.append(total_expected_time)
+                    total_expected_time = 0
+                total_expected_time += expected_time
+            totals.append(total_expected_time)
+
+            ends = starts[1:] + [len(group_idx)]
+            for start, end, total_expected_time in zip(starts, ends, totals):
                 stations.append({
                     'station_id': f"S{station_id}",
-                    'processes': [{'id': p['id'], 'name': p['name']} for p in station_processes],
+                    'processes': [{'id': ids[i], 'name': names[i]} for i in group_idx[start:end]],
                     'total_expected_time': total_expected_time,
                     'waste_time': throughput_target - total_expected_time,
                     'machines_required': math.ceil(total_expected_time)
@@ -143,7 +387,7 @@ def generate_summary_report(station_allocation):
     total_waste_time = sum(station['waste_time'] for station in station_allocation['stations'])
     total_machines_required = sum(station['machines_required'] for station in station_allocation['stations'])
 
-    report = f"""
+    parts = [f"""
     Summary Report:
     =================
     - Total Stations: {total_stations}
@@ -152,73 +396,101 @@ def generate_summary_report(station_allocation):
 
     Station Details:
     ================
-    """
+    """]
     for station in station_allocation['stations']:
-        report += f"""
+        parts.append(f"""
         Station ID: {station['station_id']}
-        - Processes: {[p['id'] for p in station['processes']]}
+        - Processes: {', '.join(str(p['id']) for p in station['processes'])}
         - Total Expected Time: {station['total_expected_time']:.2f} minutes
         - Waste Time: {station['waste_time']:.2f} minutes
         - Machines Required: {station['machines_required']}
-        """
+        """)
 
-    return report
+    return ''.join(parts)
 
 
-def visualize_station_allocation(station_allocation, df):
+def build_process_index(df):
+    """Map each process ID to its row position in the DataFrame."""
+    return dict(zip(df['id'], range(len(df))))
+
+
+def visualize_station_allocation(station_allocation, df, min_label_width=0.05, process_index=None, fig=None, ax=None):
     """
     Visualize station allocation using a Gantt chart.
 
     Args:
         station_allocation (dict): Station allocation details.
         df (pd.DataFrame): DataFrame containing process data.
+        min_label_width (float): Bars at most this many minutes wide are drawn without a label.
+        process_index (dict): Optional mapping of process ID to row position in df, built from df if omitted.
+        fig (Figure): Optional figure from a previous call to draw into instead of creating a new one.
+        ax (Axes): Optional axes to draw into; defaults to fig's current axes, and fig defaults to its figure.
 
     Returns:
         fig: Matplotlib figure object.
     """
-    # Create a mapping of process IDs to their expected time and machine type
-    process_info_map = df.set_index('id')[['expectedTimeInMin', 'machineType']].to_dict(orient='index')
-
-    # Get unique machine types and assign a color to each
-    machine_types = df['machineType'].unique()
-    colors = plt.cm.tab20.colors  # Use a colormap for distinct colors
-    machine_color_map = {machine: colors[i % len(colors)] for i, machine in enumerate(machine_types)}
-
-    fig, ax = plt.subplots(figsize=(14, 8))
-
+    # Create a mapping of process IDs to their rows
+    if process_index is None:
+        process_index = build_process_index(df)
+    times = df['expectedTimeInMin'].to_numpy(dtype=np.float64)
+
+    # Assign a color to each machine type, in order of first appearance, and look it up for every row
+    mtype_codes, machine_types = pd.factorize(df['machineType'], use_na_sentinel=False)
+    palette = np.array(plt.cm.tab20.colors)  # Use a colormap for distinct colors
+    mtype_colors = palette[np.arange(len(machine_types)) % len(palette)]
+    row_colors = mtype_colors[mtype_codes]
+
+    if fig is None and ax is None:
+        fig, ax = plt.subplots(figsize=(14, 8), constrained_layout=True)
+    else:
+        # Reuse the caller's figure, clearing what the previous call drew
+        if ax is None:
+            ax = fig.gca()
+        elif fig is None:
+            fig = ax.figure
+        ax.clear()
+
+    labels = []
     for i, station in enumerate(station_allocation['stations']):
-        processes = station['processes']
+        xranges = []
+        facecolors = []
         start_time = 0
-        for process in processes:
-            process_id = process['id']
-            process_info = process_info_map.get(process_id, {'expectedTimeInMin': 0, 'machineType': 'Unknown'})
-            expected_time = process_info['expectedTimeInMin']
-            machine_type = process_info['machineType']
-
-            # Get the color for the machine type
-            color = machine_color_map.get(machine_type, 'gray')
-
-            # Create a horizontal bar for the process
-            ax.barh(i, expected_time, left=start_time, color=color, edgecolor='black', label=machine_type)
-            
-            # Add process name and duration as text inside the bar
-            ax.text(start_time + expected_time / 2, i, f"{process['name']}\n({expected_time:.2f} min)", 
-                    ha='center', va='center', color='white', fontsize=9, fontweight='bold')
+        for process in station['processes']:
+            row = process_index.get(process['id'])
+            expected_time = times[row] if row is not None else 0
+
+            # Collect the process bar, colored by its machine type
+            xranges.append((start_time, expected_time))
+            facecolors.append(row_colors[row] if row is not None else 'gray')
+
+            # Keep process name and duration to label the bar, if it is wide enough to read
+            if expected_time > min_label_width:
+                labels.append((start_time + expected_time / 2, i, f"{process['name']}\n({expected_time:.2f} min)"))
 
             start_time += expected_time
 
+        # Draw all of the station's process bars as a single collection
+        ax.broken_barh(xranges, (i - 0.4, 0.8), facecolors=facecolors, edgecolor='black')
+
+    # Add the labels inside their bars, sharing one font across all of them
+    label_font = FontProperties(size=9, weight='bold')
+    for x, y, text in labels:
+        ax.annotate(text, xy=(x, y), ha='center', va='center', color='white', fontproperties=label_font, clip_on=True)
+
     # Customize the plot
     ax.set_yticks(range(len(station_allocation['stations'])))
     ax.set_yticklabels([f"Station {station['station_id']}" for station in station_allocation['stations']])
+    ax.set_xlim(left=0)
     ax.set_xlabel('Time (minutes)', fontsize=12)
     ax.set_title('Station Allocation and Process Timing (Grouped by Machine Type)', fontsize=14, fontweight='bold')
     ax.grid(axis='x', linestyle='--', alpha=0.7)
 
     # Create a legend for machine types
-    legend_elements = [patches.Patch(color=color, label=machine) for machine, color in machine_color_map.items()]
+    legend_elements = [patches.Patch(color=color, label=machine) for machine, color in zip(machine_types, mtype_colors)]
     ax.legend(handles=legend_elements, bbox_to_anchor=(1.05, 1), loc='upper left', title="Machine Type")
 
-    plt.tight_layout()
+    # Render the bars and labels as one image in vector output instead of compositing every artist
+    ax.set_rasterized(True)
     return fig
 
 
@@ -227,6 +499,7 @@ def main(json_file_path, respect_dependencies, max_waste_tolerance=0.1):
     df = load_data(json_file_path)
     if df is None:
         return
+    process_index = build_process_index(df)
 
     # Allocate processes to stations
     station_allocation = allocate_processes_to_stations(df, respect_dependencies=respect_dependencies, throughput_target=1.0)
@@ -243,7 +516,7 @@ def main(json_file_path, respect_dependencies, max_waste_tolerance=0.1):
     print(f"Summary report saved to {summary_report_file}")
 
     # Visualize the station allocation and save the plot to a PNG file
-    fig = visualize_station_allocation(station_allocation, df)
+    fig = visualize_station_allocation(station_allocation, df, process_index=process_index)
     visualization_file = "v1.png"
     save_visualization(fig, visualization_file)
     print(f"Visualization saved to {visualization_file}")
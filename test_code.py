@@ -0,0 +1,176 @@
+import importlib.util
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# code.py shares its name with the standard library's code module, so load it by path
+_spec = importlib.util.spec_from_file_location('process_allocation', os.path.join(HERE, 'code.py'))
+allocation = importlib.util.module_from_spec(_spec)
+sys.modules['process_allocation'] = allocation
+_spec.loader.exec_module(allocation)
+
+
+def kernel_args(json_file, throughput_target):
+    """Build the allocator kernel arguments for a bundled process list."""
+    df = allocation.load_data(os.path.join(HERE, json_file))
+    indeg, succ_flat, succ_offsets = allocation._build_dependency_graph(
+        df['id'].tolist(), df['dependency'].tolist())
+    mtype_codes, _ = pd.factorize(df['machineType'], sort=True, use_na_sentinel=False)
+    times = df['expectedTimeInMin'].to_numpy(dtype=np.float64)
+    return indeg, succ_flat, succ_offsets, mtype_codes.astype(np.int32), times, throughput_target
+
+
+def assert_same_allocation(expected, actual):
+    for expected_arr, actual_arr in zip(expected, actual):
+        np.testing.assert_array_equal(expected_arr, actual_arr)
+
+
+@pytest.mark.parametrize('json_file', ['data.json', 'examp.json'])
+@pytest.mark.parametrize('throughput_target', [0.3, 0.5, 1.0, 2.0])
+def test_python_fallback_matches_kernel(json_file, throughput_target):
+    args = kernel_args(json_file, throughput_target)
+    assert_same_allocation(allocation._allocate_numba(*args), allocation._allocate_python(*args))
+
+
+@pytest.mark.parametrize('json_file', ['data.json', 'examp.json'])
+@pytest.mark.parametrize('throughput_target', [0.3, 0.5, 1.0, 2.0])
+def test_compiled_kernel_matches_python_fallback(json_file, throughput_target):
+    compiled = allocation._compiled_allocator()
+    if compiled is None:
+        pytest.skip("numba is not installed")
+    args = kernel_args(json_file, throughput_target)
+    assert_same_allocation(allocation._allocate_python(*args), compiled(*args))
+
+
+def test_dependencies_allocated_no_later_than_dependents():
+    df = allocation.load_data(os.path.join(HERE, 'data.json'))
+    station_allocation = allocation.allocate_processes_to_stations(df, respect_dependencies=True)
+    station_of = {p['id']: k for k, station in enumerate(station_allocation['stations'])
+                  for p in station['processes']}
+    assert len(station_of) == len(df)
+    for process_id, deps in zip(df['id'], df['dependency']):
+        for dep in deps:
+            assert station_of[dep] <= station_of[process_id]
+
+
+@pytest.mark.parametrize('throughput_target, expected', [
+    (0.3, [['process001'], ['process003'], ['process002']]),
+    (0.5, [['process001'], ['process003'], ['process002']]),
+    (1.0, [['process001', 'process002'], ['process003']]),
+    (2.0, [['process001', 'process002', 'process003']]),
+])
+def test_dependency_allocation_of_example_file(throughput_target, expected):
+    df = allocation.load_data(os.path.join(HERE, 'examp.json'))
+    station_allocation = allocation.allocate_processes_to_stations(
+        df, respect_dependencies=True, throughput_target=throughput_target)
+    assert [[p['id'] for p in station['processes']] for station in station_allocation['stations']] == expected
+
+
+# Stations of the original grouping implementation, without the empty station it opened
+# when a process alone exceeded the throughput target (examp.json and data.json at 0.3)
+@pytest.mark.parametrize('json_file, throughput_target, expected', [
+    ('examp.json', 0.3, [[1], [2], [3]]),
+    ('examp.json', 0.5, [[1], [2], [3]]),
+    ('examp.json', 1.0, [[1, 2], [3]]),
+    ('examp.json', 2.0, [[1, 2, 3]]),
+    ('data.json', 0.3, [[17], [19], [6], [8], [13], [18], [20], [1], [2], [3], [4], [5], [7], [9], [10],
+                        [11], [12], [14], [15], [16]]),
+    ('data.json', 0.5, [[17], [19], [6], [8], [13], [18, 20], [1], [2], [3], [4], [5], [7], [9], [10],
+                        [11], [12], [14], [15], [16]]),
+    ('data.json', 1.0, [[17], [19], [6, 8], [13], [18, 20], [1, 2], [3], [4, 5], [7, 9], [10], [11, 12],
+                        [14, 15], [16]]),
+    ('data.json', 2.0, [[17], [19], [6, 8, 13], [18, 20], [1, 2, 3, 4], [5, 7, 9, 10], [11, 12, 14, 15],
+                        [16]]),
+])
+def test_grouped_allocation_of_bundled_files(json_file, throughput_target, expected):
+    df = allocation.load_data(os.path.join(HERE, json_file))
+    station_allocation = allocation.allocate_processes_to_stations(
+        df, respect_dependencies=False, throughput_target=throughput_target)
+    stations = [[p['id'] for p in station['processes']] for station in station_allocation['stations']]
+    assert stations == [['process%03d' % n for n in station] for station in expected]
+    assert [station['station_id'] for station in station_allocation['stations']] == [
+        f'S{k}' for k in range(1, len(expected) + 1)]
+
+
+def test_grouped_allocation_skips_empty_stations():
+    df = allocation.load_data(os.path.join(HERE, 'data.json'))
+    station_allocation = allocation.allocate_processes_to_stations(
+        df, respect_dependencies=False, throughput_target=0.3)
+    assert len(station_allocation['stations']) == len(df)
+    assert all(station['processes'] for station in station_allocation['stations'])
+
+
+def test_summary_report_lists_non_string_ids():
+    station_allocation = {'stations': [{
+        'station_id': 'S1', 'processes': [{'id': 1, 'name': 'a'}, {'id': 2, 'name': 'b'}],
+        'total_expected_time': 0.5, 'waste_time': 0.5, 'machines_required': 1}]}
+    assert '- Processes: 1, 2' in allocation.generate_summary_report(station_allocation)
+
+
+def test_load_data_returns_independent_copies():
+    json_file = os.path.join(HERE, 'data.json')
+    allocation.load_data(json_file).at[0, 'dependency'].append('bogus')
+    df = allocation.load_data(json_file)
+    assert 'bogus' not in df.at[0, 'dependency']
+    allocation.allocate_processes_to_stations(df, respect_dependencies=True)
+
+
+def test_visualization_draws_into_given_axes():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    df = allocation.load_data(os.path.join(HERE, 'examp.json'))
+    station_allocation = allocation.allocate_processes_to_stations(df)
+    fig, ax = plt.subplots()
+    assert allocation.visualize_station_allocation(station_allocation, df, ax=ax) is fig
+    assert ax.get_yticklabels()[0].get_text() == 'Station S1'
+    plt.close(fig)
+
+
+@pytest.mark.parametrize('respect_dependencies', [True, False])
+def test_missing_machine_type_is_allocated_as_its_own_type(respect_dependencies):
+    df = pd.DataFrame.from_records([
+        {'id': 'p1', 'name': 'a', 'machineType': None, 'dependency': [], 'expectedTimeInMin': 0.3},
+        {'id': 'p2', 'name': 'b', 'machineType': 'M', 'dependency': ['p1'], 'expectedTimeInMin': 0.4},
+        {'id': 'p3', 'name': 'c', 'machineType': None, 'dependency': ['p2'], 'expectedTimeInMin': 0.2},
+    ])
+    station_allocation = allocation.allocate_processes_to_stations(df, respect_dependencies=respect_dependencies)
+    stations = [[p['id'] for p in station['processes']] for station in station_allocation['stations']]
+    if respect_dependencies:
+        assert stations == [['p1'], ['p2'], ['p3']]
+    else:
+        assert stations == [['p2'], ['p1', 'p3']]
+
+
+def integer_id_processes():
+    return pd.DataFrame.from_records([
+        {'id': 1, 'name': 'a', 'machineType': 'M', 'dependency': [], 'expectedTimeInMin': 0.3},
+        {'id': 2, 'name': 'b', 'machineType': 'M', 'dependency': [1], 'expectedTimeInMin': 0.4},
+    ])
+
+
+@pytest.mark.parametrize('respect_dependencies', [True, False])
+def test_allocation_holds_plain_python_values(respect_dependencies):
+    station_allocation = allocation.allocate_processes_to_stations(
+        integer_id_processes(), respect_dependencies=respect_dependencies)
+    assert json.loads(json.dumps(station_allocation))['stations'][0]['processes'] == [
+        {'id': 1, 'name': 'a'}, {'id': 2, 'name': 'b'}]
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_save_to_file_writes_integer_ids_with_either_backend(use_orjson, tmp_path, monkeypatch):
+    if use_orjson and allocation.orjson is None:
+        pytest.skip("orjson is not installed")
+    if not use_orjson:
+        monkeypatch.setattr(allocation, 'orjson', None)
+    station_allocation = allocation.allocate_processes_to_stations(integer_id_processes())
+    output_file = tmp_path / 'allocation.json'
+    allocation.save_to_file(station_allocation, str(output_file))
+    assert json.loads(output_file.read_text()) == station_allocation